@@ -1,34 +1,155 @@
 import sys
 import os
+import json
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
 import requests
 from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QPushButton, QLineEdit, QFileDialog,
                              QMessageBox, QFrame, QProgressBar, QTextEdit,
-                             QTabWidget)
+                             QTabWidget, QCheckBox)
 from PyQt6.QtGui import QPixmap, QFont, QFontDatabase
 from PyQt6.QtCore import Qt, QSettings, QDir, QThread, pyqtSignal
 
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.thread_names = {}
+        self.start_ns = time.perf_counter_ns()
+
+    def reset(self):
+        self.events = []
+        self.thread_names = {}
+        self.start_ns = time.perf_counter_ns()
+
+    def span(self, name, category):
+        # Disabled profiling hands back a shared no-op context so hot paths stay cheap
+        if not self.enabled:
+            return _NULL_SPAN
+        return _ProfilerSpan(self, name, category)
+
+    def now(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def name_thread(self, name):
+        self.thread_names[threading.get_native_id()] = name
+
+    def record(self, name, category, start_ns, end_ns, overlapping=False):
+        self.events.append((name, category, start_ns, end_ns, threading.get_native_id(), overlapping))
+
+    def to_chrome_trace(self):
+        trace_events = []
+        for thread_id, thread_name in self.thread_names.items():
+            trace_events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': os.getpid(),
+                'tid': thread_id,
+                'args': {'name': thread_name},
+            })
+        for event_id, (name, category, start_ns, end_ns, thread_id, overlapping) in enumerate(self.events):
+            start_us = (start_ns - self.start_ns) / 1000
+            end_us = (end_ns - self.start_ns) / 1000
+            if overlapping:
+                # Spans that can overlap on one thread are exported as async begin/end pairs
+                for phase, timestamp in (('b', start_us), ('e', end_us)):
+                    trace_events.append({
+                        'name': name,
+                        'cat': category,
+                        'ph': phase,
+                        'id': event_id,
+                        'ts': timestamp,
+                        'pid': os.getpid(),
+                        'tid': thread_id,
+                    })
+                continue
+            trace_events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': start_us,
+                'dur': end_us - start_us,
+                'pid': os.getpid(),
+                'tid': thread_id,
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summary(self):
+        stages = {}
+        for name, category, start_ns, end_ns, thread_id, overlapping in self.events:
+            durations = stages.setdefault(category, [])
+            durations.append((end_ns - start_ns) / 1e6)
+        if not stages:
+            return 'No profiling data recorded.'
+
+        lines = [f"{'Stage':<12}{'Count':>8}{'Total ms':>12}{'Mean ms':>12}{'Max ms':>12}"]
+        for category, durations in sorted(stages.items(), key=lambda item: -sum(item[1])):
+            total = sum(durations)
+            lines.append(f"{category:<12}{len(durations):>8}{total:>12.2f}"
+                         f"{total / len(durations):>12.2f}{max(durations):>12.2f}")
+        return '\n'.join(lines)
+
+class _ProfilerSpan:
+    __slots__ = ('profiler', 'name', 'category', 'start_ns')
+
+    def __init__(self, profiler, name, category):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, self.category, self.start_ns, time.perf_counter_ns())
+        return False
+
+_NULL_SPAN = nullcontext()
+profiler = Profiler()
+
+def get_user_font_dir():
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(data_home, 'fonts', 'HebrewGoogleFonts')
+
 class DownloadThread(QThread):
-    progress_update = pyqtSignal(int, str)
+    progress_update = pyqtSignal(int, str, object)
     download_complete = pyqtSignal(int)
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, api_key, folder):
+    def __init__(self, api_key, folder, install_fonts=False):
         super().__init__()
         self.api_key = api_key
         self.folder = folder
+        self.install_fonts = install_fonts
+
+    def report_progress(self, value, message):
+        # The emit timestamp lets the GUI side measure how long the update sat in the event queue
+        self.progress_update.emit(value, message, profiler.now())
 
     def run(self):
+        profiler.name_thread('DownloadThread')
         try:
             url = f"https://www.googleapis.com/webfonts/v1/webfonts?key={self.api_key}&subset=hebrew"
-            response = requests.get(url)
+            with profiler.span('Fetch catalog', 'catalog'):
+                response = requests.get(url)
             if response.status_code != 200:
                 self.error_occurred.emit(f'Failed to fetch fonts: {response.text}')
                 return
 
-            fonts = response.json().get('items', [])
-            hebrew_fonts = [font for font in fonts if 'hebrew' in font['subsets']]
+            with profiler.span('Parse catalog', 'parse'):
+                fonts = response.json().get('items', [])
+            with profiler.span('Filter Hebrew fonts', 'filter'):
+                hebrew_fonts = [font for font in fonts if 'hebrew' in font['subsets']]
             total_fonts = len(hebrew_fonts)
             new_fonts = 0
 
@@ -36,28 +157,96 @@ class DownloadThread(QThread):
                 font_name = font['family']
                 font_url = font['files'].get('regular', '')
                 if not font_url:
-                    self.progress_update.emit(i + 1, f"Skipping {font_name}: No regular style available")
+                    self.report_progress(i + 1, f"Skipping {font_name}: No regular style available")
                     continue
 
                 font_path = os.path.join(self.folder, f"{font_name}.ttf")
                 if os.path.exists(font_path):
-                    self.progress_update.emit(i + 1, f"Skipping {font_name}: Already downloaded")
+                    self.report_progress(i + 1, f"Skipping {font_name}: Already downloaded")
                     continue
 
-                self.progress_update.emit(i + 1, f"Downloading {font_name}...")
-                font_response = requests.get(font_url)
+                self.report_progress(i + 1, f"Downloading {font_name}...")
+                with profiler.span(f'Transfer {font_name}', 'transfer'):
+                    font_response = requests.get(font_url)
                 if font_response.status_code == 200:
-                    with open(font_path, 'wb') as f:
-                        f.write(font_response.content)
+                    with profiler.span(f'Write {font_name}', 'write'):
+                        with open(font_path, 'wb') as f:
+                            f.write(font_response.content)
                     new_fonts += 1
-                    self.progress_update.emit(i + 1, f"Successfully downloaded {font_name}")
+                    self.report_progress(i + 1, f"Successfully downloaded {font_name}")
                 else:
-                    self.progress_update.emit(i + 1, f"Failed to download {font_name}")
+                    self.report_progress(i + 1, f"Failed to download {font_name}")
+
+            if self.install_fonts:
+                with profiler.span('Install fonts', 'install'):
+                    self.install_fonts_to_user_dir(hebrew_fonts, new_fonts, total_fonts)
 
             self.download_complete.emit(new_fonts)
         except Exception as e:
             self.error_occurred.emit(str(e))
 
+    def install_fonts_to_user_dir(self, hebrew_fonts, new_fonts, total_fonts):
+        if not sys.platform.startswith('linux'):
+            self.report_progress(total_fonts, "Skipping install: only supported on Linux")
+            return
+
+        start_time = time.monotonic()
+        installed_fonts = 0
+        failed_fonts = 0
+        status = "font cache refreshed"
+        try:
+            install_dir = get_user_font_dir()
+            changed_dirs = []
+            if not os.path.isdir(install_dir):
+                os.makedirs(install_dir)
+                changed_dirs.append(os.path.dirname(install_dir))
+
+            if os.path.abspath(self.folder) == os.path.abspath(install_dir):
+                # Fonts were synced straight into the install dir, so only the cache needs refreshing
+                installed_fonts = new_fonts
+            else:
+                # Catalog fonts missing or stale in the install dir, so earlier syncs and
+                # previously failed copies are picked up too
+                for font in hebrew_fonts:
+                    file_name = f"{font['family']}.ttf"
+                    font_path = os.path.join(self.folder, file_name)
+                    target_path = os.path.join(install_dir, file_name)
+                    if not os.path.exists(font_path):
+                        continue
+                    if os.path.exists(target_path) and os.path.getmtime(target_path) >= os.path.getmtime(font_path):
+                        continue
+                    try:
+                        shutil.copy2(font_path, target_path)
+                    except OSError as e:
+                        self.report_progress(total_fonts, f"Failed to install {font['family']}: {e}")
+                        failed_fonts += 1
+                        continue
+                    installed_fonts += 1
+            if installed_fonts:
+                changed_dirs.append(install_dir)
+
+            if not changed_dirs:
+                status = "all fonts already installed"
+                return
+
+            # A single fc-cache call scoped to the touched directories avoids a full rebuild
+            fc_cache = shutil.which('fc-cache')
+            if not fc_cache:
+                status = "fc-cache not found, font cache was not refreshed"
+                return
+            result = subprocess.run([fc_cache, *changed_dirs],
+                                    capture_output=True, text=True, timeout=120)
+            if result.returncode != 0:
+                status = f"fc-cache failed: {result.stderr.strip()}"
+        except subprocess.TimeoutExpired:
+            status = "fc-cache timed out, font cache was not refreshed"
+        except OSError as e:
+            status = f"install failed: {e}"
+        finally:
+            elapsed = time.monotonic() - start_time
+            self.report_progress(total_fonts, f"Install step took {elapsed:.2f}s: {installed_fonts} installed, "
+                                              f"{failed_fonts} failed, {status}")
+
 class GoogleFontsDownloader(QWidget):
     def __init__(self):
         super().__init__()
@@ -102,6 +291,12 @@ class GoogleFontsDownloader(QWidget):
         self.setup_config_tab(config_layout)
         tab_widget.addTab(config_tab, "Config")
 
+        # Diagnostics tab
+        diagnostics_tab = QWidget()
+        diagnostics_layout = QVBoxLayout(diagnostics_tab)
+        self.setup_diagnostics_tab(diagnostics_layout)
+        tab_widget.addTab(diagnostics_tab, "Diagnostics")
+
         # About tab
         about_tab = QWidget()
         about_layout = QVBoxLayout(about_tab)
@@ -165,6 +360,12 @@ class GoogleFontsDownloader(QWidget):
         folder_layout.addStretch()
         layout.addLayout(folder_layout)
 
+        # Install option
+        self.install_checkbox = QCheckBox('Install synced Hebrew fonts for the current user (Linux)')
+        self.install_checkbox.setStyleSheet('font-size: 14px;')
+        self.install_checkbox.setEnabled(sys.platform.startswith('linux'))
+        layout.addWidget(self.install_checkbox)
+
         # Buttons layout
         buttons_layout = QHBoxLayout()
         buttons_layout.setSpacing(10)
@@ -244,6 +445,48 @@ class GoogleFontsDownloader(QWidget):
         self.last_run_label.setStyleSheet('font-size: 12px; color: #666; margin-top: 10px;')
         layout.addWidget(self.last_run_label)
 
+    def setup_diagnostics_tab(self, layout):
+        layout.setSpacing(20)
+
+        # Profiling option
+        self.profiling_checkbox = QCheckBox('Enable profiling')
+        self.profiling_checkbox.setStyleSheet('font-size: 14px;')
+        layout.addWidget(self.profiling_checkbox)
+
+        # Profiling summary
+        self.diagnostics_output = QTextEdit()
+        self.diagnostics_output.setReadOnly(True)
+        self.diagnostics_output.setStyleSheet("""
+            QTextEdit {
+                background-color: #2b2b2b;
+                color: #f0f0f0;
+                font-family: Consolas, Monaco, monospace;
+                font-size: 12px;
+                border-radius: 5px;
+                padding: 5px;
+            }
+        """)
+        self.diagnostics_output.setPlainText(profiler.summary())
+        layout.addWidget(self.diagnostics_output)
+
+        # Export trace button
+        self.export_trace_button = QPushButton('Export Trace')
+        self.export_trace_button.clicked.connect(self.export_trace)
+        self.export_trace_button.setStyleSheet("""
+            QPushButton {
+                background-color: #008CBA;
+                color: white;
+                border-radius: 5px;
+                padding: 10px;
+                font-size: 14px;
+                min-width: 120px;
+            }
+            QPushButton:hover {
+                background-color: #007B9A;
+            }
+        """)
+        layout.addWidget(self.export_trace_button)
+
     def setup_about_tab(self, layout):
         description_text = (
             "This utility uses the Google Fonts API to search for fonts in the Google Fonts "
@@ -268,22 +511,39 @@ class GoogleFontsDownloader(QWidget):
             self.settings.setValue('folder', folder)
             self.folder_button.setText('Selected: ' + os.path.basename(folder))
 
+    def export_trace(self):
+        if not profiler.events:
+            QMessageBox.warning(self, 'Error', 'No profiling data to export. Enable profiling and run a download first.')
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Trace", "trace.json", "Chrome Trace (*.json)")
+        if path:
+            try:
+                profiler.export(path)
+            except OSError as e:
+                QMessageBox.warning(self, 'Error', f'Failed to export trace: {e}')
+                return
+            QMessageBox.information(self, 'Success', f'Trace exported to {path}\nOpen it in chrome://tracing or ui.perfetto.dev.')
+
     def load_settings(self):
         api_key = self.settings.value('api_key', '')
         folder = self.settings.value('folder', '')
         last_run = self.settings.value('last_run', 'Never')
+        install_fonts = self.settings.value('install_fonts', False, type=bool)
 
         self.api_key_input.setText(api_key)
+        self.install_checkbox.setChecked(install_fonts)
         if folder:
             self.folder_button.setText('Selected: ' + os.path.basename(folder))
         self.last_run_label.setText(f'Last run: {last_run}')
 
     def save_config(self):
         self.settings.setValue('api_key', self.api_key_input.text())
+        self.settings.setValue('install_fonts', self.install_checkbox.isChecked())
         QMessageBox.information(self, 'Success', 'Configuration saved successfully.')
 
     def save_settings(self):
         self.settings.setValue('api_key', self.api_key_input.text())
+        self.settings.setValue('install_fonts', self.install_checkbox.isChecked())
         self.settings.setValue('last_run', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
     def download_fonts(self):
@@ -295,25 +555,41 @@ class GoogleFontsDownloader(QWidget):
 
         self.terminal_output.clear()
         self.progress_bar.setValue(0)
+        # Freeze the profiling flag for the whole run so the timeline is never partial
+        profiler.reset()
+        profiler.enabled = self.profiling_checkbox.isChecked()
+        profiler.name_thread('GUI')
+        self.profiling_checkbox.setEnabled(False)
+        self.export_trace_button.setEnabled(False)
         self.download_button.setEnabled(False)
 
-        self.download_thread = DownloadThread(api_key, folder)
+        install_fonts = self.install_checkbox.isEnabled() and self.install_checkbox.isChecked()
+        self.download_thread = DownloadThread(api_key, folder, install_fonts)
         self.download_thread.progress_update.connect(self.update_progress)
         self.download_thread.download_complete.connect(self.download_finished)
         self.download_thread.error_occurred.connect(self.download_error)
         self.download_thread.start()
 
-    def update_progress(self, value, message):
-        self.progress_bar.setValue(value)
-        self.terminal_output.append(message)
+    def update_progress(self, value, message, emitted_ns):
+        if emitted_ns:
+            profiler.record('Queued progress update', 'queue', emitted_ns, time.perf_counter_ns(), overlapping=True)
+        with profiler.span('Update progress', 'ui'):
+            self.progress_bar.setValue(value)
+            self.terminal_output.append(message)
 
     def download_finished(self, new_fonts):
+        self.diagnostics_output.setPlainText(profiler.summary())
+        self.profiling_checkbox.setEnabled(True)
+        self.export_trace_button.setEnabled(True)
         self.save_settings()
         self.load_settings()
         self.download_button.setEnabled(True)
         QMessageBox.information(self, 'Success', f'Download complete!\n{new_fonts} new fonts were added to the repository.')
 
     def download_error(self, error_message):
+        self.diagnostics_output.setPlainText(profiler.summary())
+        self.profiling_checkbox.setEnabled(True)
+        self.export_trace_button.setEnabled(True)
         self.download_button.setEnabled(True)
         QMessageBox.warning(self, 'Error', error_message)
 